@@ -1,28 +1,83 @@
 """
 API routes for the Live 3D AI Agent.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import desc, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Dict, Any, Optional
+import asyncio
+import logging
 import uuid
 
 from database import get_db, Conversation
+from database.db import AsyncSessionLocal
 from api.schemas import (
     QueryRequest,
     QueryResponse,
     DocumentIngestRequest,
     DocumentIngestResponse,
-    ConversationHistoryResponse
+    ConversationHistoryResponse,
+    SimliSessionRequest,
+    SimliSpeakRequest,
+    SimliStopRequest
 )
-from services import rag_service, langgraph_service
+from services import rag_service, langgraph_service, semantic_cache, simli_service
 from config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
+async def _persist_conversation(
+    session_id: str,
+    query: str,
+    result: Dict[str, Any],
+    query_embedding: Optional[List[float]] = None
+) -> None:
+    """
+    Save a chat exchange (and optionally its cache entry) after the response is sent.
+    
+    Uses its own database session since the request-scoped one is closed by then.
+    
+    Args:
+        session_id: Conversation session ID
+        query: User query
+        result: Agent workflow result
+        query_embedding: Query embedding to store in the semantic cache, if any
+    """
+    # Nothing to save if generation failed mid-stream
+    if not result.get("response"):
+        return
+    
+    try:
+        async with AsyncSessionLocal() as db:
+            # Core insert: the row is never read back, so skip the ORM unit of work
+            await db.execute(
+                insert(Conversation).values(
+                    session_id=session_id,
+                    user_message=query,
+                    assistant_message=result["response"],
+                    intent=result.get("intent"),
+                    retrieval_context={
+                        "docs": result.get("context_docs", [])
+                    }
+                )
+            )
+            
+            if query_embedding is not None:
+                await semantic_cache.store(query, query_embedding, result, db)
+            
+            await db.commit()
+    except Exception:
+        logger.exception("❌ Error saving conversation for session %s", session_id)
+
+
 @router.post("/chat", response_model=QueryResponse)
 async def chat(
     request: QueryRequest,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -30,44 +85,131 @@ async def chat(
     
     Args:
         request: Query request with user message and session ID
+        background_tasks: Background tasks run after the response is sent
         db: Database session
         
     Returns:
         AI response with metadata
     """
     try:
-        # Run LangGraph workflow
-        result = await langgraph_service.run(
-            query=request.query,
-            session_id=request.session_id,
-            db=db
-        )
-        
-        # Save conversation to database
-        conversation = Conversation(
-            session_id=request.session_id,
-            user_message=request.query,
-            assistant_message=result["response"],
-            intent=result.get("intent"),
-            retrieval_context={
-                "docs": result.get("context_docs", [])
-            }
+        # Serve semantically equivalent queries from the cache
+        query_embedding = None
+        result = None
+        # Cached responses aren't tenant-scoped, so tenant queries skip the cache
+        if settings.semantic_cache_enabled and request.tenant_id is None:
+            query_embedding = await rag_service.embed_query(request.query)
+            result = await semantic_cache.lookup(query_embedding, db)
+        
+        cache_embedding = None
+        if result is None:
+            # Run LangGraph workflow
+            result = await langgraph_service.run(
+                query=request.query,
+                session_id=request.session_id,
+                db=db,
+                query_embedding=query_embedding,
+                tenant_id=request.tenant_id
+            )
+            cache_embedding = query_embedding
+        
+        # Save conversation to database off the response path
+        background_tasks.add_task(
+            _persist_conversation,
+            request.session_id,
+            request.query,
+            result,
+            cache_embedding
         )
-        db.add(conversation)
-        await db.commit()
         
-        return QueryResponse(
+        # Values come from our own workflow, so skip re-validation
+        return QueryResponse.model_construct(
             response=result["response"],
             intent=result.get("intent"),
             context_used=len(result.get("context_docs", [])) > 0,
             session_id=request.session_id
         )
         
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Timed out generating a response"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing chat: {str(e)}"
+        )
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: QueryRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Chat endpoint that streams the response as plain text while it is generated.
+    
+    Args:
+        request: Query request with user message and session ID
+        background_tasks: Background tasks run after the response is sent
+        db: Database session
+        
+    Returns:
+        Streaming plain-text response
+    """
+    query_embedding = None
+    cached = None
+    try:
+        if settings.semantic_cache_enabled and request.tenant_id is None:
+            query_embedding = await rag_service.embed_query(request.query)
+            cached = await semantic_cache.lookup(query_embedding, db)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing chat: {str(e)}"
         )
+    
+    if cached is not None:
+        background_tasks.add_task(
+            _persist_conversation,
+            request.session_id,
+            request.query,
+            cached
+        )
+        return StreamingResponse(iter([cached["response"]]), media_type="text/plain")
+    
+    # Filled by the workflow as it runs; saved once the stream has been sent
+    result: Dict[str, Any] = {}
+    
+    async def stream_chunks():
+        # The request-scoped session is closed before the body is streamed
+        async with AsyncSessionLocal() as stream_db:
+            try:
+                async for chunk in langgraph_service.arun_stream(
+                    query=request.query,
+                    session_id=request.session_id,
+                    db=stream_db,
+                    query_embedding=query_embedding,
+                    tenant_id=request.tenant_id,
+                    final_state=result
+                ):
+                    yield chunk
+            except Exception:
+                # Headers are already sent; re-raising aborts the body so the
+                # client sees an incomplete response rather than a short answer
+                result.clear()
+                logger.exception("❌ Error streaming chat for session %s", request.session_id)
+                raise
+    
+    background_tasks.add_task(
+        _persist_conversation,
+        request.session_id,
+        request.query,
+        result,
+        query_embedding
+    )
+    return StreamingResponse(stream_chunks(), media_type="text/plain")
 
 
 @router.post("/ingest", response_model=DocumentIngestResponse)
@@ -86,20 +228,16 @@ async def ingest_documents(
         Success status and document IDs
     """
     try:
-        # Ensure metadatas list matches texts length
-        metadatas = request.metadatas
-        if not metadatas:
-            metadatas = [{} for _ in request.texts]
-        elif len(metadatas) < len(request.texts):
-            metadatas.extend([{} for _ in range(len(request.texts) - len(metadatas))])
-        
-        # Ingest documents
+        # Ingest documents (metadatas are padded to match texts by the schema)
         doc_ids = await rag_service.ingest_documents(
             texts=request.texts,
-            metadatas=metadatas,
+            metadatas=request.metadatas,
             db=db
         )
         
+        # Cached RAG answers don't reflect the new documents
+        await semantic_cache.invalidate_rag_responses(db)
+        
         return DocumentIngestResponse(
             success=True,
             document_ids=doc_ids,
@@ -131,16 +269,24 @@ async def get_conversation_history(
         Conversation history
     """
     try:
-        from sqlalchemy import select, desc
-        
-        result = await db.execute(
-            select(Conversation)
+        # Pick the latest N, then return them oldest-first for display
+        latest = (
+            select(
+                Conversation.id,
+                Conversation.user_message,
+                Conversation.assistant_message,
+                Conversation.intent,
+                Conversation.created_at
+            )
             .where(Conversation.session_id == session_id)
             .order_by(desc(Conversation.created_at))
             .limit(limit)
+            .subquery()
         )
         
-        conversations = result.scalars().all()
+        result = await db.execute(
+            select(latest).order_by(latest.c.created_at.asc())
+        )
         
         conv_list = [
             {
@@ -148,9 +294,11 @@ async def get_conversation_history(
                 "user_message": conv.user_message,
                 "assistant_message": conv.assistant_message,
                 "intent": conv.intent,
+                # Explicit isoformat keeps the "+00:00" offset clients already parse
+                # (pydantic would emit a "Z" suffix for UTC datetimes)
                 "created_at": conv.created_at.isoformat() if conv.created_at else None
             }
-            for conv in reversed(conversations)
+            for conv in result.all()
         ]
         
         return ConversationHistoryResponse(
@@ -174,14 +322,14 @@ async def create_new_session():
     Returns:
         New session ID
     """
-    session_id = str(uuid.uuid4())
+    session_id = uuid.uuid4().hex
     return {"session_id": session_id}
 
 
 # ===== Simli + LiveKit Routes =====
 
 @router.post("/simli/session")
-async def create_simli_session(request: dict = None):
+async def create_simli_session(request: Optional[SimliSessionRequest] = None):
     """
     Create a new Simli + LiveKit avatar session.
     
@@ -192,21 +340,18 @@ async def create_simli_session(request: dict = None):
         Session info with room_url and access_token
     """
     try:
-        from services.simli_service import simli_service
+        logger.debug("📥 /simli/session called with request: %s", request)
         
-        print(f"\n📥 /simli/session called with request: {request}")
-        print(f"📥 Request type: {type(request)}\n")
-        
-        # Handle None request
+        # Handle missing body
         if request is None:
-            request = {}
+            request = SimliSessionRequest()
         
         # Generate room name if not provided or is None
-        room_name = request.get("room_name") or f"room-{uuid.uuid4()}"
-        instructions = request.get("instructions") or "You are a helpful AI assistant. Talk to me!"
+        room_name = request.room_name or f"room-{uuid.uuid4().hex}"
+        instructions = request.instructions or "You are a helpful AI assistant. Talk to me!"
         
-        print(f"📝 Generated room_name: {room_name}")
-        print(f"📝 Instructions: {instructions}\n")
+        logger.debug("📝 Generated room_name: %s", room_name)
+        logger.debug("📝 Instructions: %s", instructions)
         
         result = await simli_service.create_avatar_session(room_name, instructions)
         
@@ -217,7 +362,7 @@ async def create_simli_session(request: dict = None):
             )
         
         # Trigger agent to join the room
-        print(f"🤖 Triggering agent dispatch for room: {room_name}")
+        logger.debug("🤖 Triggering agent dispatch for room: %s", room_name)
         await simli_service.trigger_agent_for_room(room_name, instructions)
         
         return result
@@ -232,7 +377,7 @@ async def create_simli_session(request: dict = None):
 
 
 @router.post("/simli/speak")
-async def simli_speak(request: dict):
+async def simli_speak(request: SimliSpeakRequest):
     """
     Send text for the Simli avatar to speak.
     
@@ -243,18 +388,7 @@ async def simli_speak(request: dict):
         Success status
     """
     try:
-        from services.simli_service import simli_service
-        
-        session_id = request.get("session_id")
-        text = request.get("text")
-        
-        if not session_id or not text:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="session_id and text are required"
-            )
-        
-        result = await simli_service.send_message_to_avatar(session_id, text)
+        result = await simli_service.send_message_to_avatar(request.session_id, request.text)
         
         if not result.get("success"):
             raise HTTPException(
@@ -274,7 +408,7 @@ async def simli_speak(request: dict):
 
 
 @router.post("/simli/stop")
-async def stop_simli_session(request: dict):
+async def stop_simli_session(request: SimliStopRequest):
     """
     Stop a Simli avatar session.
     
@@ -285,17 +419,7 @@ async def stop_simli_session(request: dict):
         Success status
     """
     try:
-        from services.simli_service import simli_service
-        
-        session_id = request.get("session_id")
-        
-        if not session_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="session_id is required"
-            )
-        
-        result = await simli_service.stop_session(session_id)
+        result = await simli_service.stop_session(request.session_id)
         
         if not result.get("success"):
             raise HTTPException(
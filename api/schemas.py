@@ -1,7 +1,7 @@
 """
 Pydantic schemas for request/response validation.
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
@@ -10,10 +10,13 @@ class QueryRequest(BaseModel):
     """Request schema for chat queries."""
     query: str = Field(..., description="User query text")
     session_id: str = Field(..., description="Conversation session ID")
+    tenant_id: Optional[str] = Field(default=None, description="Only retrieve documents whose metadata has this tenant_id")
 
 
 class QueryResponse(BaseModel):
     """Response schema for chat queries."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     response: str
     intent: Optional[str] = None
     context_used: bool = False
@@ -24,17 +27,48 @@ class DocumentIngestRequest(BaseModel):
     """Request schema for document ingestion."""
     texts: List[str] = Field(..., description="List of document texts")
     metadatas: Optional[List[Dict[str, Any]]] = Field(default_factory=list)
+    
+    @model_validator(mode="after")
+    def pad_metadatas(self) -> "DocumentIngestRequest":
+        """Ensure there is one metadata dict per text."""
+        if self.metadatas is None:
+            self.metadatas = []
+        missing = len(self.texts) - len(self.metadatas)
+        if missing > 0:
+            self.metadatas.extend({} for _ in range(missing))
+        return self
 
 
 class DocumentIngestResponse(BaseModel):
     """Response schema for document ingestion."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     success: bool
     document_ids: List[int]
     message: str
 
 
+class SimliSessionRequest(BaseModel):
+    """Request schema for creating a Simli avatar session."""
+    room_name: Optional[str] = Field(default=None, description="LiveKit room name (generated if omitted)")
+    instructions: Optional[str] = Field(default=None, description="Instructions for the AI agent")
+
+
+class SimliSpeakRequest(BaseModel):
+    """Request schema for sending text to the Simli avatar."""
+    session_id: str = Field(..., min_length=1, description="Simli session ID")
+    text: str = Field(..., min_length=1, description="Text for the avatar to speak")
+
+
+class SimliStopRequest(BaseModel):
+    """Request schema for stopping a Simli avatar session."""
+    session_id: str = Field(..., min_length=1, description="Simli session ID")
+
+
 class VideoStatusResponse(BaseModel):
     """Response schema for video status."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     video_id: str
     status: str
     video_url: Optional[str] = None
@@ -44,6 +78,8 @@ class VideoStatusResponse(BaseModel):
 
 class StreamingTokenResponse(BaseModel):
     """Response schema for streaming token."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     success: bool
     token: Optional[str] = None
     session_id: Optional[str] = None
@@ -51,11 +87,12 @@ class StreamingTokenResponse(BaseModel):
     ice_servers: Optional[List[Dict[str, Any]]] = None
     ice_servers2: Optional[List[Dict[str, Any]]] = None
     error: Optional[str] = None
-    error: Optional[str] = None
 
 
 class ConversationHistoryResponse(BaseModel):
     """Response schema for conversation history."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     session_id: str
     conversations: List[Dict[str, Any]]
     count: int
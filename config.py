@@ -2,9 +2,9 @@
 Configuration module for the Live 3D AI Agent backend.
 """
 import os
-from pydantic import Field, computed_field
+from typing import Literal
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -17,7 +17,8 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env",
         case_sensitive=False,
-        extra="ignore"
+        extra="ignore",
+        frozen=True
     )
     
     # API Keys
@@ -25,23 +26,37 @@ class Settings(BaseSettings):
     heygen_api_key: str = Field(default="")
     simli_api_key: str = Field(default="")
     simli_face_id: str = Field(default="")
+    simli_session_ttl: int = Field(default=3600)  # idle seconds before an unstopped session is dropped; refreshed on /simli/speak
+    simli_max_sessions: int = Field(default=10_000)
+    simli_room_prune_interval: int = Field(default=300)  # seconds; 0 disables LiveKit room pruning
     
     # Database
     database_url: str = Field(default= os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./test.db"))
+    db_pool_size: int = Field(default=10)
+    db_max_overflow: int = Field(default=20)
+    db_pool_recycle: int = Field(default=1800)  # seconds
+    db_ssl_insecure: bool = Field(default=False)  # skip TLS certificate verification
+    db_echo: bool = Field(default=False)  # log every SQL statement
+    db_slow_query_ms: float = Field(default=50)
     
     # Server
     host: str = Field(default="0.0.0.0")
     port: int = Field(default=8000)
+    # Keep at 1 while Simli sessions and agent tasks live in process memory
+    workers: int = Field(default=1)
     debug: bool = Field(default=True)
     
-    # CORS - stored as string, parsed to list
+    # CORS - stored as string, parsed once into the `cors_origins` tuple
     cors_origins_str: str = Field(default="http://localhost:3000,http://localhost:5173,https://cite-talk-voice-frontend-a6sd.vercel.app", alias="cors_origins")
     
-    @computed_field  # type: ignore[misc]
-    @property
-    def cors_origins(self) -> List[str]:
+    @model_validator(mode="after")
+    def parse_cors_origins(self) -> "Settings":
         """Parse CORS origins from comma-separated string."""
-        return [origin.strip() for origin in self.cors_origins_str.split(',') if origin.strip()]
+        # Settings are frozen, so write the derived attribute directly
+        self.__dict__["cors_origins"] = tuple(
+            origin.strip() for origin in self.cors_origins_str.split(',') if origin.strip()
+        )
+        return self
     
     # HeyGen
     heygen_video_id: str = Field(default="f395175e7c614214a6547297263ae8c2")
@@ -50,11 +65,43 @@ class Settings(BaseSettings):
     # OpenAI Model
     openai_model: str = Field(default="gpt-4o-mini")
     openai_embedding_model: str = Field(default="text-embedding-3-small")
+    embedding_dim: int = Field(default=1536)
+    openai_max_connections: int = Field(default=100)  # shared HTTP pool across OpenAI clients
+    openai_max_keepalive_connections: int = Field(default=50)
+    llm_request_timeout_s: float = Field(default=30)  # per chat completion request
+    query_embedding_timeout_s: float = Field(default=5)  # per query embeddings request
+    ingest_embedding_timeout_s: float = Field(default=120)  # per ingest batch (up to EMBEDDING_BATCH_SIZE texts)
+    agent_timeout_s: float = Field(default=45)  # whole chat workflow (incl. streaming), including retries
     
     # RAG Settings
     chunk_size: int = Field(default=1000)
     chunk_overlap: int = Field(default=200)
     retrieval_top_k: int = Field(default=4)
+    rag_context_max_chars: int = Field(default=8000)  # retrieved context passed to the LLM
+    
+    # pgvector index on documents.embedding
+    # hnsw: better recall, handles streaming inserts; ivfflat: much faster/smaller build for bulk-loaded corpora
+    vector_index_type: Literal["hnsw", "ivfflat"] = Field(default="hnsw")
+    ivfflat_lists: int = Field(default=100)  # used when created empty; rebuild_vector_index uses sqrt(rows)
+    ivfflat_probes: int = Field(default=10)
+    hnsw_m: int = Field(default=24)
+    hnsw_ef_construction: int = Field(default=128)
+    hnsw_ef_search: int = Field(default=40)  # floor; raised to 4 * top_k per query
+    index_maintenance_work_mem: str = Field(default="2GB")
+    index_max_parallel_workers: int = Field(default=7)
+    embedding_batch_size: int = Field(default=1000)  # texts per embeddings request (OpenAIEmbeddings chunk_size)
+    embedding_max_concurrency: int = Field(default=8)
+    ingest_insert_page_size: int = Field(default=500)  # rows per INSERT statement
+    query_embedding_batch_size: int = Field(default=16)
+    query_embedding_batch_wait_ms: float = Field(default=10)
+    retrieval_lru_size: int = Field(default=1024)  # embedding buckets kept in the in-process retrieval cache
+    retrieval_lru_ttl: int = Field(default=300)  # seconds; also bounds staleness in workers that didn't handle an ingest
+    retrieval_lru_threshold: float = Field(default=0.98)  # min cosine similarity for a hit
+    
+    # Semantic response cache
+    semantic_cache_enabled: bool = Field(default=True)
+    semantic_cache_threshold: float = Field(default=0.97)  # min cosine similarity for a hit
+    semantic_cache_ttl: int = Field(default=3600)  # seconds; RAG answers are also dropped on every ingest
 
 
 # Global settings instance
@@ -2,7 +2,7 @@
 Database package initialization.
 """
 from database.db import Base, get_db, init_db, close_db
-from database.models import Document, Conversation, HeyGenVideo
+from database.models import Document, Conversation, QueryCache, HeyGenVideo
 
 __all__ = [
     "Base",
@@ -11,5 +11,6 @@ __all__ = [
     "close_db",
     "Document",
     "Conversation",
+    "QueryCache",
     "HeyGenVideo"
 ]
@@ -1,15 +1,37 @@
 """
 Database configuration and connection management.
 """
-from sqlalchemy import create_engine, text
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.pool import NullPool
-import asyncio
+from sqlalchemy.orm import declarative_base
+import logging
+import math
 import ssl as ssl_module
+import time
 
 from config import settings
 
+logger = logging.getLogger(__name__)
+
+_SSL_CTX = None
+
+
+def _get_ssl_ctx() -> ssl_module.SSLContext:
+    """
+    Build the asyncpg SSL context once (loading the CA bundle is not free).
+    
+    Certificates are verified unless DB_SSL_INSECURE is set.
+    """
+    global _SSL_CTX
+    if _SSL_CTX is None:
+        ctx = ssl_module.create_default_context()
+        if settings.db_ssl_insecure:
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl_module.CERT_NONE
+        _SSL_CTX = ctx
+    return _SSL_CTX
+
+
 # Convert database URL for async  driver
 # Remove sslmode from query string and handle it via connect_args
 def prepare_database_url(url: str, async_driver: bool = False) -> tuple:
@@ -25,28 +47,47 @@ def prepare_database_url(url: str, async_driver: bool = False) -> tuple:
     # Prepare SSL context for asyncpg
     connect_args = {}
     if 'sslmode=require' in url:
-        ssl_context = ssl_module.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl_module.CERT_NONE
-        connect_args = {"ssl": ssl_context}
+        connect_args = {"ssl": _get_ssl_ctx()}
     
     return url_clean, connect_args
 
-# Prepare URLs
-DATABASE_URL, _ = prepare_database_url(settings.database_url, async_driver=False)
+# Prepare URL
 ASYNC_DATABASE_URL, async_connect_args = prepare_database_url(settings.database_url, async_driver=True)
 
-# Create sync engine for initial setup
-sync_engine = create_engine(DATABASE_URL, poolclass=NullPool)
+# Connections are pooled so requests don't pay connect + TLS setup each time.
+# SQLite (local fallback) doesn't use a sized pool.
+pool_args = {}
+if not ASYNC_DATABASE_URL.startswith("sqlite"):
+    pool_args = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.db_pool_recycle
+    }
 
 # Create async engine for application use
+# Bound parameters are never logged: embeddings would be >15 KB per statement.
 async_engine = create_async_engine(
     ASYNC_DATABASE_URL,
     connect_args=async_connect_args,
-    poolclass=NullPool,
-    echo=settings.debug
+    echo=settings.db_echo,
+    echo_pool=False,
+    hide_parameters=True,
+    **pool_args
 )
 
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_start_time"] = time.perf_counter()
+
+
+@event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+def _log_slow_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info.pop("query_start_time")) * 1000
+    if elapsed_ms > settings.db_slow_query_ms:
+        logger.warning("🐢 Slow query (%.1f ms): %s", elapsed_ms, statement)
+
 # Session factory
 AsyncSessionLocal = async_sessionmaker(
     async_engine,
@@ -57,16 +98,65 @@ AsyncSessionLocal = async_sessionmaker(
 # Base class for models
 Base = declarative_base()
 
+# Advisory lock key guarding schema setup in init_db
+INIT_DB_LOCK_ID = 7_313_041_001
+
+# Every index name documents.embedding may have, whichever VECTOR_INDEX_TYPE built it
+DOCUMENT_VECTOR_INDEXES = ("ix_documents_embedding_hnsw", "ix_documents_embedding_ivfflat")
+
 
 async def get_db():
     """
     Dependency to get database session.
     """
     async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+        yield session
+
+
+async def _set_index_build_settings(conn) -> None:
+    """
+    Give index builds in the current transaction more memory and workers.
+    """
+    await conn.execute(
+        text("SELECT set_config('maintenance_work_mem', :mem, true)"),
+        {"mem": settings.index_maintenance_work_mem}
+    )
+    await conn.execute(
+        text("SELECT set_config('max_parallel_maintenance_workers', :workers, true)"),
+        {"workers": str(settings.index_max_parallel_workers)}
+    )
+
+
+async def _migrate_embeddings_to_halfvec(conn) -> None:
+    """
+    Convert documents.embedding from vector to halfvec on existing databases.
+    """
+    result = await conn.execute(text("""
+        SELECT format_type(atttypid, atttypmod)
+        FROM pg_attribute
+        WHERE attrelid = 'documents'::regclass AND attname = 'embedding'
+    """))
+    column_type = result.scalar()
+    
+    if column_type and column_type.startswith("vector"):
+        dim = settings.embedding_dim
+        # vector_cosine_ops doesn't apply to halfvec; the index is recreated afterwards
+        for index_name in DOCUMENT_VECTOR_INDEXES:
+            await conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+        await conn.execute(text(
+            f"ALTER TABLE documents ALTER COLUMN embedding "
+            f"TYPE halfvec({dim}) USING embedding::halfvec({dim})"
+        ))
+        print("✅ Converted documents.embedding to halfvec")
+
+
+def _create_missing_indexes(sync_conn) -> None:
+    """
+    Create model indexes that are missing from already existing tables.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
 
 
 async def init_db():
@@ -79,11 +169,27 @@ async def init_db():
         
         # Create tables using async engine
         async with async_engine.begin() as conn:
+            # Serialize DDL across uvicorn workers; released at commit
+            await conn.execute(
+                text("SELECT pg_advisory_xact_lock(:lock_id)"),
+                {"lock_id": INIT_DB_LOCK_ID}
+            )
+            
             # Enable pgvector extension
             await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
             
             # Create all tables
             await conn.run_sync(Base.metadata.create_all)
+            
+            # Upgrade columns whose type changed since the table was created
+            await _migrate_embeddings_to_halfvec(conn)
+            
+            # Create indexes added to models after their tables existed
+            await _set_index_build_settings(conn)
+            await conn.run_sync(_create_missing_indexes)
+            
+            # Superseded by ix_conv_session_created (session_id is its leading column)
+            await conn.execute(text("DROP INDEX IF EXISTS ix_conversations_session_id"))
         
         print("✅ Database tables created successfully")
         
@@ -92,6 +198,45 @@ async def init_db():
         raise
 
 
+async def rebuild_vector_index():
+    """
+    Drop and recreate the documents embedding index with the current settings.
+    
+    Needed after changing index parameters or VECTOR_INDEX_TYPE, since existing
+    indexes keep the ones they were built with. Reads keep working (without the
+    index) while it rebuilds; writes to documents wait until it is done.
+    
+    IVFFlat clusters are trained on the rows present at build time, so run this
+    after bulk loads; lists is set to sqrt(row count).
+    """
+    from database.models import Document
+    
+    vector_indexes = [
+        index for index in Document.__table__.indexes
+        if "embedding" in index.columns
+    ]
+    
+    # Drop in its own transaction so the exclusive lock is released right away
+    async with async_engine.begin() as conn:
+        for index_name in DOCUMENT_VECTOR_INDEXES:
+            await conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+    
+    async with async_engine.begin() as conn:
+        await _set_index_build_settings(conn)
+        
+        if settings.vector_index_type == "ivfflat":
+            row_count = (await conn.execute(text("SELECT count(*) FROM documents"))).scalar()
+            lists = max(1, int(math.sqrt(row_count)))
+            for index in vector_indexes:
+                index.dialect_options["postgresql"]["with"] = {"lists": lists}
+            print(f"📊 IVFFlat lists = {lists} for {row_count} rows")
+        
+        for index in vector_indexes:
+            await conn.run_sync(index.create)
+    
+    print(f"✅ Rebuilt vector indexes: {', '.join(index.name for index in vector_indexes)}")
+
+
 async def close_db():
     """
     Close database connections.
@@ -1,10 +1,11 @@
 """
 Database models for the Live 3D AI Agent.
 """
-from sqlalchemy import Column, String, Integer, Float, DateTime, Text, JSON
+from sqlalchemy import Column, String, Integer, Float, DateTime, Text, JSON, Index, text
 from sqlalchemy.sql import func
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import HALFVEC, Vector
 
+from config import settings
 from database.db import Base
 
 
@@ -17,9 +18,34 @@ class Document(Base):
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
     doc_metadata = Column(JSON, default={})  # Renamed to avoid conflict with SQLAlchemy's metadata
-    embedding = Column(Vector(1536))  # OpenAI embedding dimension
+    embedding = Column(HALFVEC(settings.embedding_dim))  # FP16 halves storage and index size
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        # ANN index for cosine similarity search (ORDER BY embedding <=> :q)
+        # Existing indexes keep their build parameters; see rebuild_vector_index()
+        Index(
+            "ix_documents_embedding_ivfflat",
+            "embedding",
+            postgresql_using="ivfflat",
+            postgresql_with={"lists": settings.ivfflat_lists},
+            postgresql_ops={"embedding": "halfvec_cosine_ops"}
+        )
+        if settings.vector_index_type == "ivfflat" else
+        Index(
+            "ix_documents_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={
+                "m": settings.hnsw_m,
+                "ef_construction": settings.hnsw_ef_construction
+            },
+            postgresql_ops={"embedding": "halfvec_cosine_ops"}
+        ),
+        # Lets the planner filter small tenants exactly instead of via the ANN index
+        Index("ix_documents_tenant_id", text("(doc_metadata ->> 'tenant_id')")),
+    )
 
 
 class Conversation(Base):
@@ -29,12 +55,42 @@ class Conversation(Base):
     __tablename__ = "conversations"
     
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(String, index=True, nullable=False)
+    session_id = Column(String, nullable=False)
     user_message = Column(Text, nullable=False)
     assistant_message = Column(Text, nullable=False)
     intent = Column(String, nullable=True)
     retrieval_context = Column(JSON, default={})
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Serves per-session history ordered by time (scanned backward for DESC)
+        Index("ix_conv_session_created", "session_id", "created_at"),
+    )
+
+
+class QueryCache(Base):
+    """
+    Model for caching chat responses keyed by query embedding.
+    """
+    __tablename__ = "query_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    query = Column(Text, nullable=False)
+    embedding = Column(Vector(settings.embedding_dim), nullable=False)
+    response = Column(Text, nullable=False)
+    intent = Column(String, nullable=True)
+    context_docs = Column(JSON, default=[])
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    
+    __table_args__ = (
+        Index(
+            "ix_query_cache_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"}
+        ),
+    )
 
 
 class HeyGenVideo(Base):
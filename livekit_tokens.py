@@ -0,0 +1,68 @@
+"""
+LiveKit access token helpers.
+
+Kept outside the services package so scripts can sign tokens without
+loading the backend (services/__init__ builds every service).
+"""
+import os
+
+
+def _access_token(room: str, identity: str, name: str):
+    """
+    Build an access token that can join, publish to and subscribe in a room.
+    
+    livekit.api is imported here rather than at module level since it pulls
+    in the protobuf stack.
+    """
+    from livekit import api
+    
+    grants = api.VideoGrants(
+        room_join=True,
+        room=room,
+        can_publish=True,
+        can_subscribe=True,
+        can_publish_data=True
+    )
+    return (
+        api.AccessToken(
+            os.getenv("LIVEKIT_API_KEY", "devkey"),
+            os.getenv("LIVEKIT_API_SECRET", "secret")
+        )
+        .with_identity(identity)
+        .with_name(name)
+        .with_grants(grants)
+    )
+
+
+def make_user_token(room: str, identity: str = "user", name: str = "User") -> str:
+    """
+    Create a JWT for a user joining a LiveKit room.
+    
+    Args:
+        room: LiveKit room name
+        identity: Participant identity
+        name: Participant display name
+        
+    Returns:
+        Signed access token
+    """
+    return _access_token(room, identity, name).to_jwt()
+
+
+def make_agent_token(
+    room: str,
+    identity: str = "simli-agent",
+    name: str = "Simli Avatar Agent"
+) -> str:
+    """
+    Create a JWT for the avatar agent joining a LiveKit room.
+    
+    Args:
+        room: LiveKit room name
+        identity: Participant identity
+        name: Participant display name
+        
+    Returns:
+        Signed access token, marked as an agent participant
+    """
+    return _access_token(room, identity, name).with_kind("agent").to_jwt()
@@ -3,12 +3,25 @@ Main FastAPI application for Live 3D AI Agent.
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+import asyncio
+import logging
+import os
 import uvicorn
 
 from config import settings
 from database.db import init_db
 from api import routes
+from services import langgraph_service, semantic_cache, simli_service, openai_http_client
+
+# Third-party libraries log warnings and errors only: at DEBUG the OpenAI SDK
+# and httpx log full request payloads (prompts, context, ingested texts)
+logging.basicConfig(level=logging.WARNING)
+
+# Debug logging for the app's own modules in development
+for app_logger in ("api", "services", "database"):
+    logging.getLogger(app_logger).setLevel(logging.DEBUG if settings.debug else logging.WARNING)
 
 
 @asynccontextmanager
@@ -22,10 +35,31 @@ async def lifespan(app: FastAPI):
     await init_db()
     print("✅ Database initialized")
     
+    # Keep the intent prototype embeddings off the first /chat request;
+    # if OpenAI is unreachable now, they are computed on first use instead
+    try:
+        await langgraph_service.warm_up()
+        print("✅ Intent prototypes ready")
+    except Exception as e:
+        print(f"⚠️ Could not precompute intent prototypes: {e}")
+    
+    cache_purge_task = None
+    if settings.semantic_cache_enabled:
+        cache_purge_task = asyncio.create_task(semantic_cache.purge_periodically())
+    
+    room_prune_task = None
+    if settings.simli_room_prune_interval > 0 and os.getenv("LIVEKIT_URL"):
+        room_prune_task = asyncio.create_task(simli_service.prune_ended_rooms_periodically())
+    
     yield
     
     # Shutdown
     print("👋 Shutting down...")
+    if cache_purge_task is not None:
+        cache_purge_task.cancel()
+    if room_prune_task is not None:
+        room_prune_task.cancel()
+    await openai_http_client.aclose()
 
 
 # Initialize FastAPI app
@@ -33,7 +67,8 @@ app = FastAPI(
     title="Live 3D AI Agent API",
     description="Real-time AI avatar with HeyGen, LangChain, and LangGraph",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -70,5 +105,6 @@ if __name__ == "__main__":
         "main:app",
         host=settings.host,
         port=settings.port,
-        reload=settings.debug
+        reload=settings.debug,
+        workers=1 if settings.debug else settings.workers
     )
@@ -0,0 +1,22 @@
+"""
+Rebuild the pgvector index on documents.embedding with the current settings.
+Run this after changing VECTOR_INDEX_TYPE / HNSW_M / HNSW_EF_CONSTRUCTION,
+or after bulk loads when using IVFFlat:
+
+    python rebuild_vector_index.py
+"""
+import asyncio
+
+from database.db import rebuild_vector_index, close_db
+
+
+async def main():
+    print("🔧 Rebuilding vector index on documents.embedding...")
+    try:
+        await rebuild_vector_index()
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
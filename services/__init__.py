@@ -4,6 +4,8 @@ Services package initialization.
 from services.rag_service import rag_service, RAGService
 from services.langgraph_service import langgraph_service, LangGraphService
 from services.simli_service import simli_service, SimliAvatarService
+from services.cache_service import semantic_cache, SemanticCacheService
+from services.openai_clients import openai_http_client
 
 __all__ = [
     "rag_service",
@@ -11,5 +13,8 @@ __all__ = [
     "langgraph_service",
     "LangGraphService",
     "simli_service",
-    "SimliAvatarService"
+    "SimliAvatarService",
+    "semantic_cache",
+    "SemanticCacheService",
+    "openai_http_client"
 ]
@@ -0,0 +1,143 @@
+"""
+Semantic response cache backed by pgvector.
+"""
+import asyncio
+import logging
+from datetime import timedelta
+from typing import List, Dict, Any, Optional
+from sqlalchemy import delete, insert, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database.db import AsyncSessionLocal
+from database.models import QueryCache
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCacheService:
+    """
+    Service for caching chat responses by query embedding similarity.
+    """
+    
+    def __init__(self):
+        self.threshold = settings.semantic_cache_threshold
+        self.ttl = timedelta(seconds=settings.semantic_cache_ttl)
+    
+    async def lookup(
+        self,
+        query_embedding: List[float],
+        db: AsyncSession
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached response for a semantically equivalent query.
+        
+        Args:
+            query_embedding: Embedding of the user query
+            db: Database session
+            
+        Returns:
+            Cached result with response, intent and context_docs, or None on miss
+        """
+        distance = QueryCache.embedding.cosine_distance(query_embedding)
+        
+        result = await db.execute(
+            select(
+                QueryCache.response,
+                QueryCache.intent,
+                QueryCache.context_docs,
+                distance.label("distance")
+            )
+            .where(QueryCache.created_at > func.now() - self.ttl)
+            .order_by(distance)
+            .limit(1)
+        )
+        row = result.first()
+        
+        if row is None or 1 - row.distance < self.threshold:
+            return None
+        
+        return {
+            "response": row.response,
+            "intent": row.intent,
+            "context_docs": row.context_docs or []
+        }
+    
+    async def store(
+        self,
+        query: str,
+        query_embedding: List[float],
+        result: Dict[str, Any],
+        db: AsyncSession
+    ) -> None:
+        """
+        Add a response to the cache. The caller is responsible for committing.
+        
+        Args:
+            query: User query
+            query_embedding: Embedding of the user query
+            result: Agent workflow result
+            db: Database session
+        """
+        await db.execute(
+            insert(QueryCache).values(
+                query=query,
+                embedding=query_embedding,
+                response=result["response"],
+                intent=result.get("intent"),
+                context_docs=result.get("context_docs", [])
+            )
+        )
+    
+    async def purge_expired(self, db: AsyncSession) -> int:
+        """
+        Delete cache entries older than the TTL.
+        
+        Args:
+            db: Database session
+            
+        Returns:
+            Number of deleted entries
+        """
+        result = await db.execute(
+            delete(QueryCache).where(QueryCache.created_at <= func.now() - self.ttl)
+        )
+        await db.commit()
+        return result.rowcount
+    
+    async def invalidate_rag_responses(self, db: AsyncSession) -> int:
+        """
+        Delete cached answers that were based on retrieved documents.
+        
+        Called after ingest so RAG answers are regenerated against the new
+        documents; direct answers don't depend on the corpus and are kept.
+        
+        Args:
+            db: Database session
+            
+        Returns:
+            Number of deleted entries
+        """
+        result = await db.execute(
+            delete(QueryCache).where(QueryCache.intent == "rag")
+        )
+        await db.commit()
+        return result.rowcount
+    
+    async def purge_periodically(self) -> None:
+        """
+        Background loop that purges expired entries once per TTL.
+        """
+        while True:
+            await asyncio.sleep(self.ttl.total_seconds())
+            try:
+                async with AsyncSessionLocal() as db:
+                    deleted = await self.purge_expired(db)
+                if deleted:
+                    logger.debug("🧹 Purged %s expired query cache entries", deleted)
+            except Exception:
+                logger.exception("❌ Error purging query cache")
+
+
+# Global semantic cache instance
+semantic_cache = SemanticCacheService()
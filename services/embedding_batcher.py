@@ -0,0 +1,83 @@
+"""
+Micro-batching for concurrent query embedding requests.
+"""
+import asyncio
+from typing import List, Optional, Set, Tuple
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent single-text embedding requests into batched calls.
+    
+    Requests are collected until max_batch_size texts are queued or
+    max_wait_ms has passed since the first one, then embedded together
+    with one aembed_documents call.
+    """
+    
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10
+    ):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()
+    
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embed a single text as part of the next batch.
+        
+        Args:
+            text: Text to embed
+            
+        Returns:
+            Embedding for the text
+        """
+        # Started lazily so the worker runs on the serving event loop
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._collect_batches())
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+    
+    async def _collect_batches(self) -> None:
+        """Group queued requests into batches and dispatch them."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Embed in the background so the next batch can start collecting
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+    
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """Embed one batch and resolve each caller's future."""
+        try:
+            embeddings = await self.embeddings.aembed_documents([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
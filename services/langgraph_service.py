@@ -1,13 +1,17 @@
 """
 LangGraph orchestration service for AI agent workflow.
 """
-from typing import Dict, Any, List, Annotated
+import asyncio
+from typing import AsyncIterator, Dict, Any, List, Annotated, Optional
 from typing_extensions import TypedDict
+import numpy as np
 from langgraph.graph import StateGraph, END
+from langgraph.types import StreamWriter
 from langchain_openai import ChatOpenAI
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
+from services.openai_clients import openai_http_client
 from services.rag_service import rag_service
 
 
@@ -18,9 +22,30 @@ class AgentState(TypedDict):
     context_docs: List[Dict[str, Any]]
     response: str
     session_id: str
+    query_embedding: Optional[List[float]]
+    tenant_id: Optional[str]
     metadata: Dict[str, Any]
 
 
+# Example queries whose mean embeddings act as intent prototypes
+INTENT_PROTOTYPES = {
+    "rag": [
+        "What does the document say about this topic?",
+        "Explain how this works according to the knowledge base.",
+        "Summarize the key findings of the research paper.",
+        "What are the details and facts about this subject?",
+        "Find information about this in the sources."
+    ],
+    "direct": [
+        "Hello, how are you?",
+        "Thanks, that was helpful!",
+        "Who are you and what can you do?",
+        "Tell me a joke.",
+        "Good morning!"
+    ]
+}
+
+
 class LangGraphService:
     """
     Service for LangGraph workflow orchestration.
@@ -30,8 +55,13 @@ class LangGraphService:
         self.llm = ChatOpenAI(
             model=settings.openai_model,
             openai_api_key=settings.openai_api_key,
-            temperature=0.7
+            temperature=0.7,
+            request_timeout=settings.llm_request_timeout_s,
+            http_async_client=openai_http_client
         )
+        # Unit-length mean embedding per intent, computed on first use
+        self._intent_prototypes: Dict[str, np.ndarray] = {}
+        self._intent_prototypes_lock = asyncio.Lock()
         self.graph = self._build_graph()
     
     def _build_graph(self) -> StateGraph:
@@ -39,92 +69,126 @@ class LangGraphService:
         Build the LangGraph workflow.
         
         Workflow:
-        1. Intent Classification Node
-        2. RAG Retrieval Node (if needed)
-        3. Response Generation Node
+        1. Query Embedding Node
+        2. Intent Classification and RAG Retrieval Nodes, in parallel
+        3. Response Generation Node (uses retrieved context only for 'rag')
         """
         workflow = StateGraph(AgentState)
         
         # Add nodes
+        workflow.add_node("embed_query", self.embed_query)
         workflow.add_node("classify_intent", self.classify_intent)
         workflow.add_node("retrieve_context", self.retrieve_context)
         workflow.add_node("generate_response", self.generate_response)
         
         # Define edges
-        workflow.set_entry_point("classify_intent")
-        
-        # Conditional edge based on intent
-        workflow.add_conditional_edges(
-            "classify_intent",
-            self.route_based_on_intent,
-            {
-                "rag": "retrieve_context",
-                "direct": "generate_response"
-            }
-        )
+        workflow.set_entry_point("embed_query")
         
-        workflow.add_edge("retrieve_context", "generate_response")
+        # Retrieve speculatively alongside classification so RAG queries don't
+        # wait for the intent; the docs are discarded for 'direct' queries
+        workflow.add_edge("embed_query", "classify_intent")
+        workflow.add_edge("embed_query", "retrieve_context")
+        workflow.add_edge(["classify_intent", "retrieve_context"], "generate_response")
         workflow.add_edge("generate_response", END)
         
         return workflow.compile()
     
-    async def classify_intent(
+    async def _get_intent_prototypes(self) -> Dict[str, np.ndarray]:
+        """
+        Embed the intent example queries once and average them per intent.
+        
+        Normally already done at startup by warm_up(); the lock keeps
+        concurrent first requests from embedding them again.
+        
+        Returns:
+            Unit-length prototype embedding per intent
+        """
+        if self._intent_prototypes:
+            return self._intent_prototypes
+        
+        async with self._intent_prototypes_lock:
+            if not self._intent_prototypes:
+                # All examples in a single embeddings request
+                intents = list(INTENT_PROTOTYPES)
+                examples = [example for intent in intents for example in INTENT_PROTOTYPES[intent]]
+                embeddings = np.asarray(await rag_service.embed_queries(examples), dtype=np.float32)
+                
+                prototypes = {}
+                start = 0
+                for intent in intents:
+                    end = start + len(INTENT_PROTOTYPES[intent])
+                    centroid = embeddings[start:end].mean(axis=0)
+                    prototypes[intent] = centroid / np.linalg.norm(centroid)
+                    start = end
+                self._intent_prototypes = prototypes
+        return self._intent_prototypes
+    
+    async def warm_up(self) -> None:
+        """
+        Compute the intent prototypes ahead of the first request.
+        """
+        await self._get_intent_prototypes()
+    
+    async def embed_query(
         self,
         state: AgentState
-    ) -> AgentState:
+    ) -> Dict[str, Any]:
         """
-        Classify user intent to determine workflow path.
+        Embed the query once for both classification and retrieval.
         
         Args:
             state: Current agent state
             
         Returns:
-            Updated state with intent
+            State update with the query embedding (empty if the caller provided it)
         """
-        query = state["query"]
-        
-        prompt = f"""Classify the user's intent for the following query.
-Choose one of: 'rag' (needs context retrieval), 'direct' (can answer directly).
-
-Query: {query}
-
-Intent (respond with just 'rag' or 'direct'):"""
-        
-        response = await self.llm.ainvoke(prompt)
-        intent = response.content.strip().lower()
+        if state.get("query_embedding") is not None:
+            return {}
         
-        # Default to 'rag' if unclear
-        if intent not in ["rag", "direct"]:
-            intent = "rag"
-        
-        state["intent"] = intent
-        return state
+        return {"query_embedding": await rag_service.embed_query(state["query"])}
     
-    def route_based_on_intent(self, state: AgentState) -> str:
+    async def classify_intent(
+        self,
+        state: AgentState
+    ) -> Dict[str, Any]:
         """
-        Route to next node based on intent.
+        Classify user intent to determine workflow path.
+        
+        Picks the intent whose prototype embedding is closest (cosine) to the
+        query embedding, which avoids an LLM round trip.
         
         Args:
             state: Current agent state
             
         Returns:
-            Next node name
+            State update with intent
         """
-        intent = state.get("intent", "rag")
-        return intent
+        query_vector = np.asarray(state["query_embedding"], dtype=np.float32)
+        query_vector = query_vector / np.linalg.norm(query_vector)
+        
+        prototypes = await self._get_intent_prototypes()
+        # Default to 'rag' on ties
+        intent = "rag"
+        if float(prototypes["direct"] @ query_vector) > float(prototypes["rag"] @ query_vector):
+            intent = "direct"
+        
+        return {"intent": intent}
     
     async def retrieve_context(
         self,
         state: AgentState
-    ) -> AgentState:
+    ) -> Dict[str, Any]:
         """
         Retrieve relevant context using RAG.
         
+        Repeated queries are served from RAGService's retrieval cache, which
+        is cleared on ingest.
+        
         Args:
             state: Current agent state
             
         Returns:
-            Updated state with context documents
+            State update with context documents
         """
         # Note: This requires a database session
         # In practice, we'll pass this through metadata
@@ -133,52 +197,101 @@ Intent (respond with just 'rag' or 'direct'):"""
         if db:
             docs = await rag_service.retrieve_relevant_docs(
                 state["query"],
-                db
+                db,
+                query_embedding=state.get("query_embedding"),
+                tenant_id=state.get("tenant_id")
             )
-            state["context_docs"] = docs
         else:
-            state["context_docs"] = []
+            docs = []
         
-        return state
+        return {"context_docs": docs}
     
     async def generate_response(
         self,
-        state: AgentState
-    ) -> AgentState:
+        state: AgentState,
+        writer: StreamWriter
+    ) -> Dict[str, Any]:
         """
         Generate final response using LLM.
         
+        The LLM output is streamed and each chunk is emitted on the graph's
+        "custom" stream (see arun_stream); with ainvoke the writer is a no-op.
+        
         Args:
             state: Current agent state
+            writer: LangGraph stream writer for response chunks
             
         Returns:
-            Updated state with response
+            State update with response and the context actually used
         """
         query = state["query"]
-        context_docs = state.get("context_docs", [])
+        # Speculatively retrieved docs only count for RAG queries
+        context_docs = state.get("context_docs", []) if state.get("intent") == "rag" else []
         
         if context_docs:
             # Use RAG service to generate response with context
-            response = await rag_service.generate_response(query, context_docs)
+            chunks = rag_service.stream_response(query, context_docs)
         else:
             # Generate direct response
-            prompt = f"""You are a helpful AI assistant. Answer the user's question naturally and conversationally.
+            chunks = self._stream_direct_response(query)
+        
+        response_parts = []
+        async for chunk in chunks:
+            writer(chunk)
+            response_parts.append(chunk)
+        
+        return {
+            "response": "".join(response_parts),
+            "context_docs": context_docs
+        }
+    
+    async def _stream_direct_response(self, query: str) -> AsyncIterator[str]:
+        """
+        Answer without retrieved context, token by token.
+        
+        Args:
+            query: User query
+            
+        Yields:
+            Response text chunks
+        """
+        prompt = f"""You are a helpful AI assistant. Answer the user's question naturally and conversationally.
 
 User Question: {query}
 
 Answer:"""
-            
-            llm_response = await self.llm.ainvoke(prompt)
-            response = llm_response.content
         
-        state["response"] = response
-        return state
+        async for chunk in self.llm.astream(prompt):
+            if chunk.content:
+                yield chunk.content
+    
+    def _initial_state(
+        self,
+        query: str,
+        session_id: str,
+        db: AsyncSession,
+        query_embedding: Optional[List[float]],
+        tenant_id: Optional[str]
+    ) -> Dict[str, Any]:
+        """Build the workflow input state."""
+        return {
+            "query": query,
+            "intent": "",
+            "context_docs": [],
+            "response": "",
+            "session_id": session_id,
+            "query_embedding": query_embedding,
+            "tenant_id": tenant_id,
+            "metadata": {"db": db}
+        }
     
     async def run(
         self,
         query: str,
         session_id: str,
-        db: AsyncSession
+        db: AsyncSession,
+        query_embedding: Optional[List[float]] = None,
+        tenant_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Run the complete agent workflow.
@@ -187,21 +300,73 @@ Answer:"""
             query: User query
             session_id: Conversation session ID
             db: Database session
+            query_embedding: Precomputed query embedding, if already available
+            tenant_id: Restrict retrieval to this tenant's documents
             
         Returns:
             Final state with response
+            
+        Raises:
+            asyncio.TimeoutError: If the workflow takes longer than AGENT_TIMEOUT_S;
+                in-flight OpenAI and database calls are cancelled
         """
-        initial_state = {
-            "query": query,
-            "intent": "",
-            "context_docs": [],
-            "response": "",
-            "session_id": session_id,
-            "metadata": {"db": db}
-        }
+        initial_state = self._initial_state(query, session_id, db, query_embedding, tenant_id)
         
-        final_state = await self.graph.ainvoke(initial_state)
+        final_state = await asyncio.wait_for(
+            self.graph.ainvoke(initial_state),
+            timeout=settings.agent_timeout_s
+        )
         return final_state
+    
+    async def arun_stream(
+        self,
+        query: str,
+        session_id: str,
+        db: AsyncSession,
+        query_embedding: Optional[List[float]] = None,
+        tenant_id: Optional[str] = None,
+        final_state: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Run the complete agent workflow, yielding the response as it is generated.
+        
+        Args:
+            query: User query
+            session_id: Conversation session ID
+            db: Database session
+            query_embedding: Precomputed query embedding, if already available
+            tenant_id: Restrict retrieval to this tenant's documents
+            final_state: If given, filled with the final state once the stream ends
+            
+        Yields:
+            Response text chunks
+            
+        Raises:
+            asyncio.TimeoutError: If the stream takes longer than AGENT_TIMEOUT_S
+        """
+        initial_state = self._initial_state(query, session_id, db, query_embedding, tenant_id)
+        
+        # Same overall budget as run(); time spent by the consumer counts too
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.agent_timeout_s
+        stream = self.graph.astream(initial_state, stream_mode=["custom", "values"])
+        try:
+            while True:
+                try:
+                    mode, payload = await asyncio.wait_for(
+                        stream.__anext__(),
+                        timeout=max(deadline - loop.time(), 0)
+                    )
+                except StopAsyncIteration:
+                    break
+                
+                if mode == "custom":
+                    yield payload
+                elif final_state is not None:
+                    final_state.update(payload)
+        finally:
+            # Cancels in-flight nodes if the stream timed out or was abandoned
+            await stream.aclose()
 
 
 # Global LangGraph service instance
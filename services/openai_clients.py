@@ -0,0 +1,16 @@
+"""
+Shared HTTP client for OpenAI API calls.
+"""
+import httpx
+
+from config import settings
+
+
+# One keep-alive pool for every ChatOpenAI / OpenAIEmbeddings instance,
+# so connections and TLS sessions are reused across services
+openai_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=settings.openai_max_connections,
+        max_keepalive_connections=settings.openai_max_keepalive_connections
+    )
+)
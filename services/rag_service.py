@@ -1,15 +1,33 @@
 """
 RAG service using LangChain and pgvector.
 """
-from typing import List, Dict, Any
+import asyncio
+from typing import AsyncIterator, List, Dict, Any, Optional
+import numpy as np
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document as LangChainDocument
-from sqlalchemy import select, text
+from langchain_core.prompts import ChatPromptTemplate
+from pgvector.sqlalchemy import HALFVEC
+from sqlalchemy import bindparam, insert, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
 from database.models import Document
+from services.embedding_batcher import EmbeddingBatcher
+from services.openai_clients import openai_http_client
+from services.retrieval_cache import RetrievalCache
+
+
+RAG_PROMPT_TEMPLATE = """You are a helpful AI assistant. Answer the user's question based on the provided context.
+If the context doesn't contain relevant information, use your general knowledge but mention that.
+
+Context:
+{context}
+
+User Question: {query}
+
+Answer:"""
 
 
 class RAGService:
@@ -18,19 +36,73 @@ class RAGService:
     """
     
     def __init__(self):
+        # Large ingest batches can take a while per request
         self.embeddings = OpenAIEmbeddings(
             model=settings.openai_embedding_model,
-            openai_api_key=settings.openai_api_key
+            openai_api_key=settings.openai_api_key,
+            request_timeout=settings.ingest_embedding_timeout_s,
+            http_async_client=openai_http_client
+        )
+        # Query embeddings are small and on the request path, so fail fast
+        self._query_embeddings = OpenAIEmbeddings(
+            model=settings.openai_embedding_model,
+            openai_api_key=settings.openai_api_key,
+            request_timeout=settings.query_embedding_timeout_s,
+            http_async_client=openai_http_client
         )
         self.llm = ChatOpenAI(
             model=settings.openai_model,
             openai_api_key=settings.openai_api_key,
-            temperature=0.7
+            temperature=0.7,
+            request_timeout=settings.llm_request_timeout_s,
+            http_async_client=openai_http_client
         )
+        # Prompt template is parsed once and reused for every answer
+        self._rag_chain = ChatPromptTemplate.from_template(RAG_PROMPT_TEMPLATE) | self.llm
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=settings.chunk_size,
             chunk_overlap=settings.chunk_overlap
         )
+        # Coalesces concurrent query embeddings into batched requests
+        self._query_batcher = EmbeddingBatcher(
+            self._query_embeddings,
+            max_batch_size=settings.query_embedding_batch_size,
+            max_wait_ms=settings.query_embedding_batch_wait_ms
+        )
+        # Reuses search results for repeated, near-identical queries
+        self._retrieval_cache = RetrievalCache(
+            maxsize=settings.retrieval_lru_size,
+            ttl=settings.retrieval_lru_ttl,
+            threshold=settings.retrieval_lru_threshold
+        )
+        # Bounds concurrent embedding requests across all ingests
+        self._embedding_semaphore = asyncio.Semaphore(settings.embedding_max_concurrency)
+    
+    async def _embed_documents(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts in fixed-size batches sent concurrently.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            float32 array of shape (len(texts), embedding_dim), in the same order as texts
+        """
+        if not texts:
+            return np.empty((0, settings.embedding_dim), dtype=np.float32)
+        
+        batch_size = settings.embedding_batch_size
+        
+        async def embed_batch(batch: List[str]) -> np.ndarray:
+            async with self._embedding_semaphore:
+                # Pack each batch right away so the per-float lists can be freed
+                return np.asarray(await self.embeddings.aembed_documents(batch), dtype=np.float32)
+        
+        results = await asyncio.gather(*[
+            embed_batch(texts[i:i + batch_size])
+            for i in range(0, len(texts), batch_size)
+        ])
+        return np.concatenate(results)
     
     async def ingest_documents(
         self,
@@ -58,30 +130,70 @@ class RAGService:
                     LangChainDocument(page_content=chunk, metadata=metadata)
                 )
         
-        # Generate embeddings
+        # Generate embeddings for all chunks, batches in parallel
         texts_to_embed = [doc.page_content for doc in documents]
-        embeddings = await self.embeddings.aembed_documents(texts_to_embed)
-        
-        # Store in database
-        doc_ids = []
-        for doc, embedding in zip(documents, embeddings):
-            db_doc = Document(
-                content=doc.page_content,
-                doc_metadata=doc.metadata,  # Updated field name
-                embedding=embedding
-            )
-            db.add(db_doc)
-            await db.flush()
-            doc_ids.append(db_doc.id)
+        embeddings = await self._embed_documents(texts_to_embed)
+        
+        # Store in database with a single bulk INSERT ... RETURNING
+        # (each embedding is a row view of the float32 array)
+        rows = [
+            {
+                "content": doc.page_content,
+                "doc_metadata": doc.metadata,
+                "embedding": embeddings[i]
+            }
+            for i, doc in enumerate(documents)
+        ]
+        if not rows:
+            return []
+        
+        # Rows are sent as multi-row INSERTs of ingest_insert_page_size each
+        result = await db.execute(
+            insert(Document).returning(Document.id, sort_by_parameter_order=True),
+            rows,
+            execution_options={"insertmanyvalues_page_size": settings.ingest_insert_page_size}
+        )
+        doc_ids = list(result.scalars().all())
         
         await db.commit()
+        
+        # Cached results don't include the new documents
+        self._retrieval_cache.clear()
         return doc_ids
     
+    async def embed_query(self, query: str) -> List[float]:
+        """
+        Generate the embedding for a single query.
+        
+        Concurrent calls are batched into a single embeddings request.
+        
+        Args:
+            query: Query text
+            
+        Returns:
+            Query embedding
+        """
+        return await self._query_batcher.embed(query)
+    
+    async def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Embed several short texts in one request with the query client.
+        
+        Args:
+            queries: Texts to embed
+            
+        Returns:
+            Embeddings in the same order as queries
+        """
+        return await self._query_embeddings.aembed_documents(queries)
+    
     async def retrieve_relevant_docs(
         self,
         query: str,
         db: AsyncSession,
-        top_k: int = None
+        top_k: int = None,
+        query_embedding: Optional[List[float]] = None,
+        tenant_id: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Retrieve relevant documents using vector similarity search.
@@ -90,6 +202,8 @@ class RAGService:
             query: Search query
             db: Database session
             top_k: Number of results to return
+            query_embedding: Precomputed query embedding, if already available
+            tenant_id: Only search documents whose metadata has this tenant_id
             
         Returns:
             List of relevant documents with metadata
@@ -97,27 +211,56 @@ class RAGService:
         if top_k is None:
             top_k = settings.retrieval_top_k
         
-        # Generate query embedding
-        query_embedding = await self.embeddings.aembed_query(query)
+        # Generate query embedding unless the caller already has it
+        if query_embedding is None:
+            query_embedding = await self.embed_query(query)
+        
+        cached_docs = self._retrieval_cache.get(query_embedding, top_k, tenant_id)
+        if cached_docs is not None:
+            return cached_docs
+        
+        # Tune the index scan for this query. Transaction-local, so it doesn't
+        # leak to other users of the pooled connection.
+        if settings.vector_index_type == "ivfflat":
+            # Number of IVF lists scanned
+            search_param, search_value = "ivfflat.probes", settings.ivfflat_probes
+        else:
+            # Widen the HNSW candidate list for larger result sets, and further
+            # when filtering since candidates of other tenants are discarded
+            oversample = 10 if tenant_id is not None else 4
+            search_param, search_value = "hnsw.ef_search", max(settings.hnsw_ef_search, top_k * oversample)
+        await db.execute(
+            text("SELECT set_config(:param, :value, true)"),
+            {"param": search_param, "value": str(search_value)}
+        )
         
         # Vector similarity search using pgvector
-        # Using cosine distance (1 - cosine similarity)
-        query_text = text("""
-            SELECT id, content, metadata, 
-                   1 - (embedding <=> :query_embedding) as similarity
-            FROM documents
-            ORDER BY embedding <=> :query_embedding
-            LIMIT :top_k
-        """)
+        # Using cosine distance (1 - cosine similarity); the distance is computed
+        # once per row in the CTE, and ORDER BY stays on the indexed expression
+        tenant_filter = ""
+        params = {"query_embedding": query_embedding, "top_k": top_k}
+        if tenant_id is not None:
+            tenant_filter = "WHERE (doc_metadata ->> 'tenant_id') = :tenant_id"
+            params["tenant_id"] = tenant_id
         
-        result = await db.execute(
-            query_text,
-            {
-                "query_embedding": str(query_embedding),
-                "top_k": top_k
-            }
+        query_text = text(f"""
+            WITH scored AS (
+                SELECT id, content, doc_metadata,
+                       embedding <=> :query_embedding AS distance
+                FROM documents
+                {tenant_filter}
+                ORDER BY embedding <=> :query_embedding
+                LIMIT :top_k
+            )
+            SELECT id, content, doc_metadata, 1 - distance AS similarity
+            FROM scored
+            ORDER BY distance
+        """).bindparams(
+            bindparam("query_embedding", type_=HALFVEC(settings.embedding_dim))
         )
         
+        result = await db.execute(query_text, params)
+        
         docs = []
         for row in result:
             docs.append({
@@ -127,8 +270,36 @@ class RAGService:
                 "similarity": float(row[3])
             })
         
+        self._retrieval_cache.put(query_embedding, top_k, docs, tenant_id)
         return docs
     
+    def _build_prompt_inputs(
+        self,
+        query: str,
+        context_docs: List[Dict[str, Any]]
+    ) -> Dict[str, str]:
+        """
+        Build the prompt variables, capping the context at RAG_CONTEXT_MAX_CHARS.
+        
+        Args:
+            query: User query
+            context_docs: Retrieved context documents (most relevant first)
+            
+        Returns:
+            Template variables for the RAG prompt
+        """
+        # Keep documents in relevance order, truncating the one that hits the budget
+        budget = settings.rag_context_max_chars
+        parts = []
+        for doc in context_docs:
+            if budget <= 0:
+                break
+            content = doc["content"][:budget]
+            parts.append(content)
+            budget -= len(content) + 2  # "\n\n" separator
+        
+        return {"context": "\n\n".join(parts), "query": query}
+    
     async def generate_response(
         self,
         query: str,
@@ -144,23 +315,27 @@ class RAGService:
         Returns:
             Generated response
         """
-        # Build context from retrieved documents
-        context = "\n\n".join([doc["content"] for doc in context_docs])
-        
-        # Create prompt
-        prompt = f"""You are a helpful AI assistant. Answer the user's question based on the provided context.
-If the context doesn't contain relevant information, use your general knowledge but mention that.
-
-Context:
-{context}
-
-User Question: {query}
-
-Answer:"""
-        
-        # Generate response
-        response = await self.llm.ainvoke(prompt)
+        response = await self._rag_chain.ainvoke(self._build_prompt_inputs(query, context_docs))
         return response.content
+    
+    async def stream_response(
+        self,
+        query: str,
+        context_docs: List[Dict[str, Any]]
+    ) -> AsyncIterator[str]:
+        """
+        Generate response using LLM with retrieved context, token by token.
+        
+        Args:
+            query: User query
+            context_docs: Retrieved context documents
+            
+        Yields:
+            Response text chunks as the LLM produces them
+        """
+        async for chunk in self._rag_chain.astream(self._build_prompt_inputs(query, context_docs)):
+            if chunk.content:
+                yield chunk.content
 
 
 # Global RAG service instance
@@ -0,0 +1,117 @@
+"""
+In-process cache of retrieval results keyed by query embedding.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+
+class RetrievalCache:
+    """
+    LRU cache of retrieved documents for near-identical query embeddings.
+    
+    Embeddings are bucketed by the sign bits of their first signature_dims
+    dimensions; a lookup is a hit only if a cached embedding in the same
+    bucket has cosine similarity >= threshold with the query. Entries expire
+    after ttl seconds. At most maxsize buckets of max_bucket_entries
+    embeddings each are kept.
+    
+    The cache is per process: clear() only affects the worker it runs in, so
+    other workers can serve pre-ingest results for up to ttl seconds.
+    
+    All methods are synchronous, so they are atomic on the event loop and
+    need no lock.
+    """
+    
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300,
+        threshold: float = 0.98,
+        signature_dims: int = 64,
+        max_bucket_entries: int = 8
+    ):
+        self.maxsize = maxsize
+        self.max_bucket_entries = max_bucket_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.signature_dims = signature_dims
+        # (signature, top_k, tenant_id) -> [(unit embedding, expires_at, docs)], least recently used first
+        self._buckets: "OrderedDict[Tuple[bytes, int, Optional[str]], List[Tuple[np.ndarray, float, List[Dict[str, Any]]]]]" = OrderedDict()
+    
+    def _prepare(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        tenant_id: Optional[str]
+    ) -> Tuple[Tuple[bytes, int, Optional[str]], np.ndarray]:
+        """Normalize the embedding and compute its bucket key."""
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        vector = vector / np.linalg.norm(vector)
+        signature = np.packbits(vector[:self.signature_dims] > 0).tobytes()
+        return (signature, top_k, tenant_id), vector
+    
+    def get(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        tenant_id: Optional[str] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up documents retrieved for a near-identical query.
+        
+        Args:
+            query_embedding: Query embedding
+            top_k: Number of results requested
+            tenant_id: Tenant the search was restricted to, if any
+            
+        Returns:
+            Cached documents, or None on a miss
+        """
+        key, vector = self._prepare(query_embedding, top_k, tenant_id)
+        bucket = self._buckets.get(key)
+        if not bucket:
+            return None
+        
+        now = time.monotonic()
+        bucket[:] = [entry for entry in bucket if entry[1] > now]
+        for cached_vector, _, docs in bucket:
+            if float(cached_vector @ vector) >= self.threshold:
+                self._buckets.move_to_end(key)
+                return docs
+        
+        if not bucket:
+            del self._buckets[key]
+        return None
+    
+    def put(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        docs: List[Dict[str, Any]],
+        tenant_id: Optional[str] = None
+    ) -> None:
+        """
+        Cache documents retrieved for a query.
+        
+        Args:
+            query_embedding: Query embedding
+            top_k: Number of results requested
+            docs: Retrieved documents
+            tenant_id: Tenant the search was restricted to, if any
+        """
+        key, vector = self._prepare(query_embedding, top_k, tenant_id)
+        now = time.monotonic()
+        bucket = [entry for entry in self._buckets.get(key, []) if entry[1] > now]
+        bucket.append((vector, now + self.ttl, docs))
+        # Oldest entries go first when a bucket is full
+        self._buckets[key] = bucket[-self.max_bucket_entries:]
+        self._buckets.move_to_end(key)
+        
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop all cached results (e.g. after new documents are ingested)."""
+        self._buckets.clear()
@@ -1,13 +1,15 @@
 """
 Simli + LiveKit Avatar Service for real-time interactive AI agent.
 """
+import asyncio
 import logging
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Set
+from cachetools import TTLCache
 from config import settings
+from livekit_tokens import make_agent_token, make_user_token
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
 
 
 class SimliAvatarService:
@@ -16,7 +18,13 @@ class SimliAvatarService:
     def __init__(self):
         self.simli_api_key = settings.simli_api_key
         self.simli_face_id = settings.simli_face_id
-        self.active_sessions: Dict[str, Any] = {}
+        # Bounded so sessions of clients that never call stop don't accumulate
+        self.active_sessions: TTLCache = TTLCache(
+            maxsize=settings.simli_max_sessions,
+            ttl=settings.simli_session_ttl
+        )
+        # Tracked rooms absent from LiveKit at the last prune check
+        self._rooms_missing_last_check: Set[str] = set()
         
     async def create_avatar_session(self, room_name: str, instructions: str = "You are a helpful AI assistant. Talk to me!") -> Dict[str, Any]:
         """
@@ -30,49 +38,15 @@ class SimliAvatarService:
             Dict containing session info with room_url and access_token
         """
         try:
-            print(f"\n🚀 CREATE_AVATAR_SESSION CALLED with room_name: {room_name}")
-            print(f"🔍 Type of room_name: {type(room_name)}")
-            print(f"🔍 Room name value: '{room_name}'\n")
-            
-            logger.info(f"🚀 Creating Simli avatar session for room: {room_name}")
+            logger.info("🚀 Creating Simli avatar session for room: %s", room_name)
             
             # Generate LiveKit access token
             try:
-                from livekit import api
-                
-                livekit_api_key = os.getenv("LIVEKIT_API_KEY", "devkey")
-                livekit_api_secret = os.getenv("LIVEKIT_API_SECRET", "secret")
-                
-                print(f"🔑 Using LiveKit API Key: {livekit_api_key[:10]}...")
-                print(f"🏠 Room name: {room_name}")
-                
-                logger.info(f"🚀 Creating Simli avatar session for room: {room_name}")
-                logger.info(f"🔑 Using LiveKit API Key: {livekit_api_key[:10]}...")
-                logger.info(f"🏠 Room name: {room_name}")
-                
-                # Create VideoGrants
-                grants = api.VideoGrants(
-                    room_join=True,
-                    room=room_name,
-                    can_publish=True,
-                    can_subscribe=True,
-                    can_publish_data=True
-                )
-                logger.info(f"📋 Created VideoGrants: room_join=True, room={room_name}")
-                
-                # Create token using fluent API with method chaining
-                token = (api.AccessToken(livekit_api_key, livekit_api_secret)
-                        .with_identity("user")
-                        .with_name("User")
-                        .with_grants(grants))
-                
-                logger.info(f"🎫 Token object created with method chaining")
-                
-                access_token = token.to_jwt()
-                logger.info(f"✅ LiveKit JWT token generated successfully: {access_token[:50]}...")
+                access_token = make_user_token(room_name)
+                logger.debug("✅ LiveKit JWT token generated successfully")
                 
             except Exception as e:
-                logger.error(f"❌ Error generating LiveKit token: {str(e)}")
+                logger.error("❌ Error generating LiveKit token: %s", e)
                 raise Exception(f"LiveKit token generation failed: {str(e)}")
             
             # LiveKit URL
@@ -89,11 +63,11 @@ class SimliAvatarService:
             
             self.active_sessions[room_name] = session_info
             
-            logger.info(f"✅ Simli avatar session created: {room_name}")
+            logger.info("✅ Simli avatar session created: %s", room_name)
             return session_info
             
         except Exception as e:
-            logger.error(f"❌ Error creating Simli avatar session: {str(e)}")
+            logger.error("❌ Error creating Simli avatar session: %s", e)
             return {
                 "success": False,
                 "error": str(e)
@@ -117,7 +91,10 @@ class SimliAvatarService:
                     "error": "Session not found"
                 }
             
-            logger.info(f"📤 Sending message to avatar in session {session_id}: {text[:50]}...")
+            # TTLCache expiry counts from insertion; re-set to keep active sessions alive
+            self.active_sessions[session_id] = self.active_sessions[session_id]
+            
+            logger.info("📤 Sending message to avatar in session %s: %s...", session_id, text[:50])
             
             # The actual text-to-speech will be handled by the LiveKit agent
             # This is just for tracking
@@ -127,7 +104,7 @@ class SimliAvatarService:
             }
             
         except Exception as e:
-            logger.error(f"❌ Error sending message to avatar: {str(e)}")
+            logger.error("❌ Error sending message to avatar: %s", e)
             return {
                 "success": False,
                 "error": str(e)
@@ -146,7 +123,7 @@ class SimliAvatarService:
         try:
             if session_id in self.active_sessions:
                 del self.active_sessions[session_id]
-                logger.info(f"✅ Stopped Simli avatar session: {session_id}")
+                logger.info("✅ Stopped Simli avatar session: %s", session_id)
                 
             return {
                 "success": True,
@@ -154,20 +131,64 @@ class SimliAvatarService:
             }
             
         except Exception as e:
-            logger.error(f"❌ Error stopping session: {str(e)}")
+            logger.error("❌ Error stopping session: %s", e)
             return {
                 "success": False,
                 "error": str(e)
             }
     
+    async def prune_ended_rooms(self) -> int:
+        """
+        Stop tracking sessions whose LiveKit room has ended.
+        
+        A room must be missing in two consecutive checks, so sessions whose
+        room hasn't been joined yet aren't dropped.
+        
+        Returns:
+            Number of sessions removed
+        """
+        from livekit import api
+        
+        livekit_url = os.getenv("LIVEKIT_URL", "ws://localhost:7880")
+        lkapi = api.LiveKitAPI(
+            livekit_url.replace("ws", "http", 1),
+            os.getenv("LIVEKIT_API_KEY", "devkey"),
+            os.getenv("LIVEKIT_API_SECRET", "secret")
+        )
+        try:
+            response = await lkapi.room.list_rooms(api.ListRoomsRequest())
+        finally:
+            await lkapi.aclose()
+        
+        live_rooms = {room.name for room in response.rooms}
+        missing = {name for name in list(self.active_sessions) if name not in live_rooms}
+        
+        ended = missing & self._rooms_missing_last_check
+        for room_name in ended:
+            self.active_sessions.pop(room_name, None)
+        self._rooms_missing_last_check = missing - ended
+        
+        return len(ended)
+    
+    async def prune_ended_rooms_periodically(self) -> None:
+        """
+        Background loop that runs prune_ended_rooms every SIMLI_ROOM_PRUNE_INTERVAL.
+        """
+        while True:
+            await asyncio.sleep(settings.simli_room_prune_interval)
+            try:
+                removed = await self.prune_ended_rooms()
+                if removed:
+                    logger.info("🧹 Removed %s ended Simli sessions", removed)
+            except Exception as e:
+                logger.warning("⚠️ Error pruning ended LiveKit rooms: %s", e)
+    
     async def trigger_agent_for_room(self, room_name: str, instructions: str) -> None:
         """
         Trigger an agent to join a specific room.
         This spawns a background task that connects the Simli agent.
         """
-        import asyncio
-        
-        logger.info(f"🤖 Spawning agent for room: {room_name}")
+        logger.info("🤖 Spawning agent for room: %s", room_name)
         
         # Spawn agent in background
         asyncio.create_task(self._run_agent_for_room(room_name, instructions))
@@ -178,10 +199,8 @@ class SimliAvatarService:
             from livekit import rtc
             from livekit.plugins import openai, simli
             from livekit.agents.utils import http_context
-            import os
-            import asyncio
             
-            logger.info(f"🎬 Agent connecting to room: {room_name}")
+            logger.info("🎬 Agent connecting to room: %s", room_name)
             
             # Get configuration
             livekit_url = os.getenv("LIVEKIT_URL", "ws://localhost:7880")
@@ -199,32 +218,15 @@ class SimliAvatarService:
             # This avoids "Attempted to use an http session outside of a job context" errors.
             http_context._new_session_ctx()
 
-            # Generate agent token
-            from livekit import api
             from livekit.agents import AgentSession
             from livekit.plugins.openai import realtime as openai_realtime
             
-            token = (
-                api.AccessToken(livekit_api_key, livekit_api_secret)
-                # Mark this participant as an agent for clarity (optional but recommended)
-                .with_kind("agent")
-                .with_identity("simli-agent")
-                .with_name("Simli Avatar Agent")
-                .with_grants(
-                    api.VideoGrants(
-                        room_join=True,
-                        room=room_name,
-                        can_publish=True,
-                        can_subscribe=True,
-                        can_publish_data=True,
-                    )
-                )
-            )
-            agent_token = token.to_jwt()
+            # Generate agent token
+            agent_token = make_agent_token(room_name)
 
             room = rtc.Room()
             await room.connect(livekit_url, agent_token)
-            logger.info(f"✅ Agent connected to room: {room_name}")
+            logger.info("✅ Agent connected to room: %s", room_name)
 
             # Create Simli configuration
             simli_config = simli.SimliConfig(
@@ -298,12 +300,10 @@ class SimliAvatarService:
 
             # Cleanup
             await room.disconnect()
-            logger.info(f"👋 Agent disconnected from room: {room_name}")
+            logger.info("👋 Agent disconnected from room: %s", room_name)
                 
         except Exception as e:
-            logger.error(f"❌ Error in agent task: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Error in agent task: %s", e)
         finally:
             # Ensure we close the plugin-managed HTTP session context
             try:
@@ -1,30 +1,12 @@
 """Test the new token generation with method chaining"""
-from livekit import api
 import jwt
 import json
-import os
 
-# Get credentials
-livekit_api_key = os.getenv("LIVEKIT_API_KEY", "APIiQgALKoHpEY3")
-livekit_api_secret = os.getenv("LIVEKIT_API_SECRET", "fwjTeWepQPijebcRRP6X97PF0zWBHRjlryR3EPH2CHcA")
-room_name = "test-room-with-grants"
-
-# Create VideoGrants
-grants = api.VideoGrants(
-    room_join=True,
-    room=room_name,
-    can_publish=True,
-    can_subscribe=True,
-    can_publish_data=True
-)
+from livekit_tokens import make_user_token
 
-# Create token using fluent API with method chaining
-token = (api.AccessToken(livekit_api_key, livekit_api_secret)
-        .with_identity("user")
-        .with_name("User")
-        .with_grants(grants))
+room_name = "test-room-with-grants"
 
-access_token = token.to_jwt()
+access_token = make_user_token(room_name)
 
 print(f"✅ JWT: {access_token}\n")
 